@@ -1,45 +1,63 @@
+import collections
+import concurrent.futures
+import errno
+import functools
+import itertools
 import os
-import PIL.Image
+import pathlib
 import platform
 import re
-import requests
 import shutil
 import sys
+import threading
 import time
 import yaml
 import zipfile
 from datetime import datetime
+from modules.cache import AssetCache
+from modules.images import image_size
 from modules.logs import MyLogger
+from modules.matcher import build_collection_index, build_index, build_search, find_collection_directory, find_media_directory, find_show_directory, fold_names, fold_show_prefixes, media_key
 from modules.notifications import discord, generate_summary
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 logger = MyLogger()
 
 ## start ##
 start_time = time.time()
-with open("VERSION", "r") as f:
-    version = f.read().strip()
-    logger.separator()
-    logger.info_center("     _                 _      _            _     _              _    ") 
-    logger.info_center("    / \   ___ ___  ___| |_   / \   ___ ___(_)___| |_ __ _ _ __ | |_  ")
-    logger.info_center("   / _ \ / __/ __|/ _ \ __| / _ \ / __/ __| / __| __/ _` | '_ \| __| ")
-    logger.info_center(r" / ___ \\__ \__ \  __/ |_ / ___ \\__ \__ \ \__ \ || (_| | | | | |_  ")
-    logger.info_center(" /_/   \_\___/___/\___|\__/_/   \_\___/___/_|___/\__\__,_|_| |_|\__| ")
-    logger.info("")
-    logger.info("")
-    logger.info(f" Version: v{version}")
+script_dir = os.path.dirname(os.path.abspath(__file__))
+version = pathlib.Path(script_dir, "VERSION").read_text().strip()
 platform_info = platform.platform()
-logger.info(f" Platform: {platform.platform()}")
+logger.separator()
+logger.info_center("\n".join([
+    "     _                 _      _            _     _              _    ",
+    "    / \   ___ ___  ___| |_   / \   ___ ___(_)___| |_ __ _ _ __ | |_  ",
+    "   / _ \ / __/ __|/ _ \ __| / _ \ / __/ __| / __| __/ _` | '_ \| __| ",
+    r" / ___ \\__ \__ \  __/ |_ / ___ \\__ \__ \ \__ \ || (_| | | | | |_  ",
+    " /_/   \_\___/___/\___|\__/_/   \_\___/___/_|___/\__\__,_|_| |_|\__| ",
+]))
+logger.info("\n".join(["", "", f" Version: v{version}", f" Platform: {platform_info}"]))
 logger.separator(text="Asset Assistant Starting", debug=False)
 
 ## load config ##  
+def load_yaml(path):
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=SafeLoader)
+
 try:
-    with open('config.yml', 'r') as f:
-        config = yaml.safe_load(f)
-        logger.info(" Loading config.yml...")
-        logger.info(" Config loaded successfully")
-        logger.separator(text="Config", space=False, border=False, debug=True)
+    config = load_yaml('config.yml')
+    logger.info(" Loading config.yml...")
+    logger.info(" Config loaded successfully")
+    logger.separator(text="Config", space=False, border=False, debug=True)
+    if SafeLoader is yaml.SafeLoader:
+        logger.debug(" LibYAML not available, install PyYAML with libyaml support for faster config loading")
+        logger.debug("")
 except FileNotFoundError:
-    logger.error(f" Config file 'config.yml' not found at {os.path.dirname(os.path.abspath(__file__))}. Terminating script.")
+    logger.error(f" Config file 'config.yml' not found at {script_dir}. Terminating script.")
     sys.exit(1)
 
 ## paths ##
@@ -47,12 +65,13 @@ process_dir = config['process']
 movies_dir = config['movies']
 shows_dir = config['shows']
 collections_dir = config['collections']
-script_dir = os.path.dirname(os.path.abspath(__file__))
 failed_dir = os.path.join(script_dir, 'failed')
 backup_enabled = config.get('enable_backup', False)
 backup_dir = os.path.join(script_dir, 'backup')
+cache_file = os.path.join(script_dir, 'cache', 'assets.json')
 service = config.get('service', None)
 plex_specials = config.get('plex_specials', None)
+workers = config.get('workers') or min(32, (os.cpu_count() or 1) + 4)
 
 ## path check ##
 unique_paths = {process_dir, movies_dir, shows_dir, collections_dir}
@@ -76,112 +95,224 @@ for dir_name, dir_path in optional_dirs.items():
     if dir_path and not os.path.exists(dir_path):
         optional_dirs[dir_name] = None
         
-logger.debug(" Process directory:")
-logger.debug(f" - {process_dir}")
-logger.debug(f" Movies directory:")
-if movies_dir:
-    logger.debug(f" - {movies_dir}")
-else:
-    logger.warning(f" - Directory not found. Skipping movies.")
-logger.debug(f" Shows directory:")
-if shows_dir:
-    logger.debug(f" - {shows_dir}")
-else:
-    logger.warning(f" - Directory not found, skipping shows")
-logger.debug(f" Collections directory:")
-if collections_dir:
-    logger.debug(f" - {collections_dir}")
-else:
-    logger.warning(f" - Directory not found, skipping collections")
-logger.debug("")
+for dir_name, dir_path in optional_dirs.items():
+    if not dir_path:
+        logger.warning(f" {dir_name.capitalize()} directory not found, skipping {dir_name}")
+
+directory_lines = [" Process directory:", f" - {process_dir}"]
+for dir_name, dir_path in optional_dirs.items():
+    if dir_path:
+        directory_lines.append(f" {dir_name.capitalize()} directory:")
+        directory_lines.append(f" - {dir_path}")
+directory_lines.append("")
+logger.debug("\n".join(directory_lines))
 
 ## service check ##
+service_features = ("Season posters", "Episode cards", "Collection assets")
 if service == None:
     logger.warning(" Naming convention: Not set") 
-    logger.debug("   Skipping:") 
-    logger.debug("   - Season posters")
-    logger.debug("   - Episode cards")
-    logger.debug("   - Collection assets")
-    logger.debug("")
+    enabled_features = ()
 else:
-    if service == "kodi" or service == "kometa":
-        logger.debug(f" Naming convention: {service.capitalize()}")
-        logger.debug("   Enabling:")
-        logger.debug("   - Season posters")
-        logger.debug("   - Episode cards")
-        logger.debug("   - Collection assets")
-        logger.debug("")
-    else:
-        logger.debug(f" Naming convention: {service.capitalize()}")
-        logger.debug("   Enabling:")
-        logger.debug("   - Season posters")
-        logger.debug("   - Episode cards")
-        logger.debug("   Skipping:")
-        logger.debug("   - Collection assets")
-        logger.debug("")
+    logger.debug(f" Naming convention: {service.capitalize()}")
+    enabled_features = service_features if service in ("kodi", "kometa") else service_features[:2]
+skipped_features = service_features[len(enabled_features):]
+
+service_lines = []
+for label, features in (("Enabling:", enabled_features), ("Skipping:", skipped_features)):
+    if features:
+        service_lines.append(f"   {label}")
+        service_lines.extend(f"   - {feature}" for feature in features)
+service_lines.append("")
+logger.debug("\n".join(service_lines))
+
+# checked before any asset is handed to a worker thread, where sys.exit would not stop the run
+if service == 'plex' and plex_specials is None:
+    logger.error(" 'plex_specials' is not set in the config, please set it to True or False and try again")
+    sys.exit(1)
 
 ## failed directory ##
-if not os.path.exists(failed_dir):
+# makedirs raising FileExistsError saves a separate exists check
+try:
     os.makedirs(failed_dir)
-    logger.debug(" Failed directory not found...")
-    logger.debug(" Successfully created failed directory")
-    logger.debug(f" - {failed_dir}")
-    logger.debug("")
-else:
-    logger.debug(f" Failed Directory:")
-    logger.debug(f" - {failed_dir}")
-    logger.debug("")
+    setup_lines = [" Failed directory not found...", " Successfully created failed directory"]
+except FileExistsError:
+    setup_lines = [" Failed Directory:"]
+setup_lines += [f" - {failed_dir}", ""]
 
 ## backup directory ##
+setup_lines.append(f" Backup Enabled: {backup_enabled}")
 if backup_enabled:
-    if not os.path.exists(backup_dir):
+    try:
         os.makedirs(backup_dir)
-        logger.debug(f" Backup Enabled: {backup_enabled}")
-        logger.debug(" Backup directory not found...")
-        logger.debug(" Successfully created backup directory")
-        logger.debug(f" - {backup_dir}")
-    else:
-        logger.debug(f" Backup Enabled: {backup_enabled}")
-        logger.debug(f" Backup Directory:")
-        logger.debug(f" - {backup_dir}")
-else:
-    logger.debug(f" Backup Enabled: {backup_enabled}")
+        setup_lines += [" Backup directory not found...", " Successfully created backup directory"]
+    except FileExistsError:
+        setup_lines.append(" Backup Directory:")
+    setup_lines.append(f" - {backup_dir}")
+setup_lines.append(f" Workers: {workers}")
+logger.debug("\n".join(setup_lines))
     
 logger.separator(text="Processing Images", debug=False, border=True)
 
+## supported images ##
+image_pattern = re.compile(r'\.(?:jpe?g|png)$', re.IGNORECASE)
+image_suffixes = ('.png', '.jpg', '.jpeg', '.PNG', '.JPG', '.JPEG')
+archive_pattern = re.compile(r'\.zip$', re.IGNORECASE)
+video_extensions = frozenset({'.mkv', '.mp4', '.avi'})
+
+def is_image(name):
+    # the usual spellings skip the regex, mixed case extensions still go through it
+    return name.endswith(image_suffixes) or image_pattern.search(name) is not None
+
+## asset categories ##
+sorted_categories = frozenset({'movie', 'show', 'season', 'episode', 'collection'})
+
+## scan process directory ##
+def scan_process_directory(process_dir):
+    zip_entries = []
+    dir_entries = []
+    file_entries = []
+    with os.scandir(process_dir) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                dir_entries.append(entry)
+            elif archive_pattern.search(entry.name):
+                zip_entries.append(entry)
+            elif entry.is_file():
+                file_entries.append(entry)
+    return zip_entries, dir_entries, file_entries
+
 ## extract zip files ##
-def unzip_files(process_dir):
-    for item in os.listdir(process_dir):
-        if item.lower().endswith('.zip'):
-            file_path = os.path.join(process_dir, item)
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(process_dir)
-            os.remove(file_path)
-            logger.info(f" Processing '{item}'")
-            logger.info("")
+def member_key(name):
+    # members ending in the same file name may land on the same path, so they share a shard,
+    # casefolded for case-insensitive filesystems
+    return name.replace('\\', '/').rsplit('/', 1)[-1].casefold()
+
+def prepare_members(zip_ref, process_dir, groups):
+    # folder entries are extracted here on the main thread before any worker starts,
+    # file members are queued by target so the same file is only written by one thread
+    members = []
+    for info in zip_ref.infolist():
+        if info.is_dir():
+            zip_ref.extract(info, process_dir)
+        else:
+            members.append((member_key(info.filename), info.filename))
+    for key, name in members:
+        groups.setdefault(key, []).append((zip_ref.filename, name))
+
+def zip_shards(groups):
+    shards = [[] for _ in range(min(workers, len(groups)))]
+    for index, group in enumerate(groups):
+        shards[index % len(shards)].extend(group)
+    return shards
+
+def extract_member(zip_ref, name, process_dir):
+    try:
+        path = zip_ref.extract(name, process_dir)
+    except FileExistsError:
+        # a parent folder with no entry of its own was made by another thread in the meantime
+        path = zip_ref.extract(name, process_dir)
+    # extract() leaves the time of extraction, the member's own timestamp lets the asset cache
+    # recognise the same poster when the same archive is dropped in again
+    try:
+        modified = time.mktime(zip_ref.getinfo(name).date_time + (0, 0, -1))
+        os.utime(path, (modified, modified))
+    except (OverflowError, ValueError):
+        pass
+
+def extract_members(members, process_dir):
+    # each thread reads the archives through its own handles and returns the first error per archive
+    errors = {}
+    handles = {}
+    try:
+        for path, name in members:
+            if path in errors:
+                continue
+            try:
+                zip_ref = handles.get(path)
+                if zip_ref is None:
+                    zip_ref = handles[path] = zipfile.ZipFile(path, 'r')
+                extract_member(zip_ref, name, process_dir)
+            except (zipfile.BadZipFile, OSError) as e:
+                errors[path] = e
+    finally:
+        for zip_ref in handles.values():
+            zip_ref.close()
+    return errors
+
+def unzip_files(process_dir, zip_entries):
+    # members of every archive are extracted in parallel, a file found in several archives
+    # is written in listing order so the later archive still wins, results are logged in listing order
+    archives = []
+    groups = {}
+    for entry in zip_entries:
+        try:
+            with zipfile.ZipFile(entry.path, 'r') as zip_ref:
+                prepare_members(zip_ref, process_dir, groups)
+        except (zipfile.BadZipFile, OSError) as e:
+            archives.append((entry, e))
+            continue
+        archives.append((entry, None))
+    errors = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for shard_errors in executor.map(extract_members, zip_shards(list(groups.values())), itertools.repeat(process_dir)):
+            for path, error in shard_errors.items():
+                errors.setdefault(path, error)
+    for entry, error in archives:
+        error = error or errors.get(entry.path)
+        if error:
+            logger.error(f" Failed to extract '{entry.name}': {error}")
+        else:
+            try:
+                os.remove(entry.path)
+                logger.info(f" Processing '{entry.name}'")
+            except OSError as e:
+                logger.error(f" Failed to extract '{entry.name}': {e}")
+        logger.info("")
 
 ## process subdirectories ##
-def process_directories(process_dir):
-    for item in os.listdir(process_dir):
-        item_path = os.path.join(process_dir, item)
-        if os.path.isdir(item_path):
-            for root, _, files in os.walk(item_path):
-                for file in files:
-                    if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                        src = os.path.join(root, file)
-                        dest = os.path.join(process_dir, file)
-                        shutil.move(src, dest)
-            shutil.rmtree(item_path)
-            logger.info(f" Processimg folder '{item}'")
+def collect_images(directory, process_dir):
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                collect_images(entry.path, process_dir)
+            elif is_image(entry.name):
+                move_file(entry.path, os.path.join(process_dir, entry.name))
+
+def flatten_directory(process_dir, entry):
+    collect_images(entry.path, process_dir)
+    shutil.rmtree(entry.path)
+
+def process_directories(process_dir, dir_entries):
+    # folders are flattened in parallel, results are logged in listing order
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(workers, len(dir_entries))) as executor:
+        futures = [executor.submit(flatten_directory, process_dir, entry) for entry in dir_entries]
+        for entry, future in zip(dir_entries, futures):
+            future.result()
+            logger.info(f" Processimg folder '{entry.name}'")
             logger.info("")
 
+## filename patterns ##
+season_pattern = re.compile(r'Season\s+(\d+)', re.IGNORECASE)
+episode_pattern = re.compile(r'S(\d+)[\s\.]?E(\d+)', re.IGNORECASE)
+episode_file_pattern = re.compile(r'.*S(\d+)[\s\.]?E(\d+)', re.IGNORECASE)
+specials_pattern = re.compile(r'Specials', re.IGNORECASE)
+show_pattern = re.compile(r'(.+)\s\((\d{4})\)', re.IGNORECASE)
+
+## destination checks ##
+existing_directories = {}
+
+def directory_exists(path):
+    exists = existing_directories.get(path)
+    if exists is None:
+        exists = existing_directories[path] = os.path.isdir(path)
+    return exists
+
+def show_directory_exists(dir_name):
+    # the shows listing answers exact names, the filesystem still decides for case-insensitive matches
+    return dir_name in show_dir_names or directory_exists(os.path.join(shows_dir, dir_name))
+
 ## define categories ##
 def categories(filename, movies_dir, shows_dir):
-    season_pattern = re.compile(r'Season\s+(\d+)', re.IGNORECASE)
-    episode_pattern = re.compile(r'S(\d+)[\s\.]?E(\d+)', re.IGNORECASE)
-    specials_pattern = re.compile(r'Specials', re.IGNORECASE)
-    show_pattern = re.compile(r'(.+)\s\((\d{4})\)', re.IGNORECASE)
-
     season_match = season_pattern.search(filename)
     episode_match = episode_pattern.search(filename)
     specials_match = specials_pattern.search(filename)
@@ -191,6 +322,7 @@ def categories(filename, movies_dir, shows_dir):
     season_number = None 
     episode_number = None
     show_name = None
+    dir_name = None
     
     if show_match:
         show_name = show_match.group(1).strip()
@@ -202,7 +334,7 @@ def categories(filename, movies_dir, shows_dir):
             season_number = season_match.group(1)
             if show_name:
                 expected_dir = f"{show_name} ({show_year})"
-                if not os.path.exists(os.path.join(shows_dir, expected_dir)):
+                if not show_directory_exists(expected_dir):
                     category = None
         else:
             category = 'skip'
@@ -212,7 +344,7 @@ def categories(filename, movies_dir, shows_dir):
             category = 'season'
             if show_name:
                 expected_dir = f"{show_name} ({show_year})/Specials"
-                if not os.path.exists(os.path.join(shows_dir, expected_dir)):
+                if not directory_exists(os.path.join(shows_dir, expected_dir)):
                     category = None
         else:
             category = 'skip'
@@ -224,33 +356,31 @@ def categories(filename, movies_dir, shows_dir):
             episode_number = episode_match.group(2)
             if show_name:
                 expected_dir = f"{show_name} ({show_year})"
-                if not os.path.exists(os.path.join(shows_dir, expected_dir)):
+                if not show_directory_exists(expected_dir):
                     category = None
         else:
             category = 'skip'
     
     else:
-        for dir_name in os.listdir(collections_dir):
-            if filename.split('.')[0].lower().replace("collection", "").strip() == dir_name.lower().replace("collection", "").strip():
-                if (service in ["kometa", "kodi"]):
-                    category = 'collection'
-                    break
-                elif service not in ["kometa", "kodi"]:
-                    category = 'not_supported'
-                break
+        # each library is searched at most once, the matched folder is handed on to copy_and_rename
+        key = media_key(filename)
+        dir_name = find_collection_directory(filename, collection_index)
+        if dir_name:
+            if service in ["kometa", "kodi"]:
+                category = 'collection'
+            else:
+                category = 'not_supported'
         else:
-            for dir_name in os.listdir(movies_dir):
-                if filename.split('.')[0].lower() in dir_name.lower():
-                    category = 'movie'
-                    break
+            dir_name = find_media_directory(key, movie_names, movie_index)
+            if dir_name:
+                category = 'movie'
             else:
-                for dir_name in os.listdir(shows_dir):
-                    if filename.split('.')[0].lower() in dir_name.lower():
-                        category = 'show'
-                        break
+                dir_name = find_media_directory(key, show_names, show_index)
+                if dir_name:
+                    category = 'show'
 
-    if category not in ['movie', 'show', 'season', 'episode', 'collection']:
-        move_to_failed(filename, process_dir, failed_dir)
+    if category not in sorted_categories:
+        move_to_failed(os.path.join(process_dir, filename), failed_dir)
         logger.info(f" {filename}:")
         if category == 'skip':
             logger.info(" - Asset skipped due to 'service' not being specified")
@@ -261,209 +391,187 @@ def categories(filename, movies_dir, shows_dir):
         logger.info(" - Moved to failed directory")
         logger.info("")
 
-    return category, season_number, episode_number
+    return category, season_number, episode_number, dir_name
     
 # copy and rename #
-def copy_and_rename(filename, category, season_number, episode_number, movies_dir, shows_dir, collections_dir, process_dir, failed_dir, service):
-    category, season_number, episode_number = categories(filename, movies_dir, shows_dir)
-    src = os.path.join(process_dir, filename)
-    dest = None
-    new_dest = None
-    directory = None
-
-    if category == 'movie' or category == 'show':
-        directory = movies_dir if category == 'movie' else shows_dir
-        for dir_name in os.listdir(directory):
-            if filename.split('.')[0].lower() in dir_name.lower():
-                dest = os.path.join(directory, dir_name, filename)
-                shutil.copy(src, dest)
-                logger.info(f" {filename}:")
-                logger.info(f" - Category: {category.capitalize()}")
-                logger.info(f" - Copied to {dir_name}")
-                with PIL.Image.open(dest) as img:
-                    width, height = img.size
-                    new_name = "poster" + os.path.splitext(filename)[1] if height > width else "background" + os.path.splitext(filename)[1]
-                    new_dest = os.path.join(directory, dir_name, new_name)
-                    os.rename(dest, new_dest)
-                    logger.info(f" - Renamed {new_name}")
-                return category
-                
-    elif category == 'collection':
-        directory = collections_dir
-        for dir_name in os.listdir(directory):
-            if filename.split('.')[0].lower().replace("collection", "").strip() in dir_name.lower():
-                dest = os.path.join(directory, dir_name, filename)
-                shutil.copy(src, dest)
-                logger.info(f" {filename}:")
-                logger.info(f" - Category: {category.capitalize()}")
-                logger.info(f" - Copied to {dir_name}")
-                with PIL.Image.open(dest) as img:
-                    width, height = img.size
-                    new_name = "poster" + os.path.splitext(filename)[1] if height > width else "background" + os.path.splitext(filename)[1]
-                    new_dest = os.path.join(directory, dir_name, new_name)
-                    os.rename(dest, new_dest)
-                    logger.info(f" - Renamed {new_name}")
-                    return category
-                    
-    #elif service == 'emby' 
-   
-    #elif service == 'jellyfin'
-   
-    #elif service == 'kodi'
-    
-    elif service == 'kometa':
-        if category == 'season':
-            directory = shows_dir
-            for dir_name in os.listdir(directory):
-                if filename.split(')')[0].strip().lower() in dir_name.split(')')[0].strip().lower():
-                    dest = os.path.join(directory, dir_name, filename)
-                    shutil.copy(src, dest)
-                    logger.info(f" {filename}:")
-                    logger.info(f" - Category: {category.capitalize()}")
-                    logger.info(f" - Copied to {dir_name}")
-                    if season_number:
-                        new_name = f"Season{season_number.zfill(2)}" + os.path.splitext(filename)[1]
-                    else:
-                        new_name = "Season00" + os.path.splitext(filename)[1]
-                    new_dest = os.path.join(directory, dir_name, new_name)
-                    os.rename(dest, new_dest)
-                    logger.info(f" - Renamed {new_name}")
-                    return category
-
-        elif category == 'episode':
-            directory = shows_dir
-            for dir_name in os.listdir(directory):
-                if filename.split(')')[0].strip().lower() in dir_name.split(')')[0].strip().lower():
-                    dest = os.path.join(directory, dir_name, filename)
-                    shutil.copy(src, dest)
-                    logger.info(f" {filename}:")
-                    logger.info(f" - Category: {category.capitalize()}")
-                    logger.info(f" - Copied to {dir_name}")
-                    new_name = f"S{season_number.zfill(2)}E{episode_number.zfill(2)}" + os.path.splitext(filename)[1]
-                    new_dest = os.path.join(directory, dir_name, new_name)
-                    os.rename(dest, new_dest)
-                    logger.info(f" - Renamed {new_name}")
-                    return category
-                    
-    elif service == 'plex':
-        if category == 'season':
-            directory = shows_dir
-            for dir_name in os.listdir(directory):
-                if filename.split(')')[0].strip().lower() in dir_name.split(')')[0].strip().lower():
-                    show_dir = os.path.join(directory, dir_name)
-                if season_number:
-                    season_dir_name = f'Season {season_number.zfill(2)}'
-                else:
-                    if 'Specials' in filename:
-                        if plex_specials is None:
-                            logger.error(" 'plex_specials' is not set in the config, please set it to True or False and try again")
-                            sys.exit(1)
-                        elif plex_specials:
-                            season_dir_name = 'Specials'
-                        else:
-                            season_dir_name = 'Season 00'
-                season_dir = os.path.join(show_dir, season_dir_name)
-                if not os.path.exists(season_dir):
-                    os.makedirs(season_dir)
-                dest = os.path.join(season_dir, filename)
-                shutil.copy(src, dest)
-                logger.info(f" {filename}:")
-                logger.info(f" - Category: {category.capitalize()}")
-                logger.info(f" - Copied to {dir_name}/{season_dir_name}")
-                if season_number:
-                    new_name = f"Season{season_number.zfill(2)}" + os.path.splitext(filename)[1]
-                else:
-                    new_name = "season-specials-poster" + os.path.splitext(filename)[1] 
-                new_dest = os.path.join(season_dir, new_name)
-                os.rename(dest, new_dest)
-                logger.info(f" - Renamed {new_name}")
-                return category
-                
-        elif category == 'episode':
-            directory = shows_dir
-            for dir_name in os.listdir(directory):
-                if filename.split(')')[0].strip().lower() in dir_name.split(')')[0].strip().lower():
-                    show_dir = os.path.join(directory, dir_name)
-                    
-                    episode_match = re.match(r'.*S(\d+)[\s\.]?E(\d+)', filename, re.IGNORECASE)
-                    if episode_match:
-                        season_number = episode_match.group(1)
-                        episode_number = episode_match.group(2)
-                    else:
-                        move_to_failed(filename, process_dir, failed_dir)
-                        category = 'failed'
-                        logger.info(f" {filename}:")
-                        logger.info(f" - Category: {category.capitalize()}")
-                        logger.error(" - Failed to extract season and episode numbers")
-                        logger.info(" - Moved to failed directory")
-                        logger.info("")
-                        return category
-                    season_number = season_number.zfill(2)
-                    episode_number = episode_number.zfill(2)
-                    if season_number == '00':
-                        if plex_specials is None:
-                            logger.error(" 'plex_specials' is not set in the config, please set it to True or False and try again")
-                            sys.exit(1)
-                        elif plex_specials:
-                            season_dir_name = 'Specials'
-                        else:
-                            season_dir_name = 'Season 00'
-                    else:
-                        season_dir_name = f'Season {season_number.zfill(2)}'
-                    season_dir = os.path.join(show_dir, season_dir_name)
-                    if not os.path.exists(season_dir):
-                        move_to_failed(filename, process_dir, failed_dir)                       
-                        category = 'failed'
-                        logger.info(f" {filename}:")
-                        logger.info(f" - Category: {category.capitalize()}")
-                        logger.error(f" - {season_dir_name} does not exist in {dir_name}")
-                        logger.info(" - Moved to failed directory")
-                        logger.info("")
-                        return category
-                    episode_video_name = None
-                    for video_file in os.listdir(season_dir):
-                        if video_file.endswith(('.mkv', '.mp4', '.avi')):
-                            video_match = re.match(r'.*S(\d+)[\s\.]?E(\d+)', video_file, re.IGNORECASE)
-                            if video_match:
-                                video_season_number = video_match.group(1)
-                                video_episode_number = video_match.group(2)
-                                if season_number == video_season_number and episode_number == video_episode_number:
-                                    episode_video_name = os.path.splitext(video_file)[0] + os.path.splitext(filename)[1]
-                                    break
-                    if episode_video_name:
-                        new_name = episode_video_name
-                        new_dest = os.path.join(season_dir, new_name)
-                        dest = os.path.join(season_dir, filename)
-                        shutil.copy(src, dest)
-                        os.rename(dest, new_dest)
-                        logger.info(f" {filename}:")
-                        logger.info(f" - Category: {category.capitalize()}")
-                        logger.info(f" - Copied to {dir_name}/{season_dir_name}")
-                        logger.info(f" - Renamed {new_name}")
-                        return category
-                    else:
-                        move_to_failed(filename, process_dir, failed_dir)
-                        category = 'failed'
-                        logger.info(f" {filename}:")
-                        logger.info(f" - Category: {category.capitalize()}")
-                        logger.error(f" - Corresponding video file not found in {dir_name}/{season_dir_name}")
-                        logger.info(" - Moved to failed directory")
-                        logger.info("")
-                        return category
-            return category
+def deliver_asset(filename, src, stat, category, new_dest, location):
+    logger.info(f" {filename}:")
+    logger.info(f" - Category: {category.capitalize()}")
+    # the destination is always worked out again, only the copy is skipped when it matches the last run
+    if asset_cache.lookup(src, stat) == new_dest:
+        logger.info(f" - Unchanged since last run, already in {location}")
     else:
-        move_to_failed(filename, process_dir, failed_dir)
-    
+        action = transfer_file(src, new_dest, stat.st_size)
+        logger.info(f" - {action} to {location}")
+        logger.info(f" - Renamed {os.path.basename(new_dest)}")
+    asset_cache.record(src, category, new_dest, stat)
     return category
 
+def fail_asset(filename, src, failed_dir, reason):
+    move_to_failed(src, failed_dir)
+    logger.info(f" {filename}:")
+    logger.info(" - Category: Failed")
+    logger.error(f" - {reason}")
+    logger.info(" - Moved to failed directory")
+    logger.info("")
+    return 'failed'
+
+def copy_library_asset(filename, src, stat, category, dir_name, directory):
+    extension = os.path.splitext(filename)[1]
+    # sized from the source so the asset lands under its final name in one step
+    width, height = image_size(src)
+    new_name = "poster" + extension if height > width else "background" + extension
+    new_dest = os.path.join(directory, dir_name, new_name)
+    return deliver_asset(filename, src, stat, category, new_dest, dir_name)
+
+def copy_kometa_season(filename, src, stat, category, season_number, episode_number, shows_dir, failed_dir):
+    extension = os.path.splitext(filename)[1]
+    dir_name = find_show_directory(filename, show_prefixes, show_index)
+    if not dir_name:
+        return fail_asset(filename, src, failed_dir, "Show directory not found")
+    if season_number:
+        new_name = f"Season{season_number.zfill(2)}" + extension
+    else:
+        new_name = "Season00" + extension
+    new_dest = os.path.join(shows_dir, dir_name, new_name)
+    return deliver_asset(filename, src, stat, category, new_dest, dir_name)
+
+def copy_kometa_episode(filename, src, stat, category, season_number, episode_number, shows_dir, failed_dir):
+    extension = os.path.splitext(filename)[1]
+    dir_name = find_show_directory(filename, show_prefixes, show_index)
+    if not dir_name:
+        return fail_asset(filename, src, failed_dir, "Show directory not found")
+    new_name = f"S{season_number.zfill(2)}E{episode_number.zfill(2)}" + extension
+    new_dest = os.path.join(shows_dir, dir_name, new_name)
+    return deliver_asset(filename, src, stat, category, new_dest, dir_name)
+
+def copy_plex_season(filename, src, stat, category, season_number, episode_number, shows_dir, failed_dir):
+    extension = os.path.splitext(filename)[1]
+    dir_name = find_show_directory(filename, show_prefixes, show_index)
+    if not dir_name:
+        return fail_asset(filename, src, failed_dir, "Show directory not found")
+    show_dir = os.path.join(shows_dir, dir_name)
+    if season_number:
+        season_number = season_number.zfill(2)
+        season_dir_name = f'Season {season_number}'
+    elif plex_specials:
+        season_dir_name = 'Specials'
+    else:
+        season_dir_name = 'Season 00'
+    season_dir = os.path.join(show_dir, season_dir_name)
+    os.makedirs(season_dir, exist_ok=True)
+    # a season folder created here must not stay cached as missing for later episode cards
+    existing_directories[season_dir] = True
+    if season_number:
+        new_name = f"Season{season_number}" + extension
+    else:
+        new_name = "season-specials-poster" + extension 
+    new_dest = os.path.join(season_dir, new_name)
+    return deliver_asset(filename, src, stat, category, new_dest, f"{dir_name}/{season_dir_name}")
+
+def copy_plex_episode(filename, src, stat, category, season_number, episode_number, shows_dir, failed_dir):
+    extension = os.path.splitext(filename)[1]
+    dir_name = find_show_directory(filename, show_prefixes, show_index)
+    if not dir_name:
+        return fail_asset(filename, src, failed_dir, "Show directory not found")
+    show_dir = os.path.join(shows_dir, dir_name)
+
+    # the last SxxEyy in the name wins, the same rule used to index the episode videos
+    episode_match = episode_file_pattern.match(filename)
+    if not episode_match:
+        return fail_asset(filename, src, failed_dir, "Failed to extract season and episode numbers")
+    season_number = episode_match.group(1).zfill(2)
+    episode_number = episode_match.group(2).zfill(2)
+    if season_number == '00':
+        if plex_specials:
+            season_dir_name = 'Specials'
+        else:
+            season_dir_name = 'Season 00'
+    else:
+        season_dir_name = f'Season {season_number}'
+    season_dir = os.path.join(show_dir, season_dir_name)
+    if not directory_exists(season_dir):
+        return fail_asset(filename, src, failed_dir, f"{season_dir_name} does not exist in {dir_name}")
+    video_name = episode_index(season_dir).get((season_number, episode_number))
+    if not video_name:
+        return fail_asset(filename, src, failed_dir, f"Corresponding video file not found in {dir_name}/{season_dir_name}")
+    new_name = video_name + extension
+    new_dest = os.path.join(season_dir, new_name)
+    return deliver_asset(filename, src, stat, category, new_dest, f"{dir_name}/{season_dir_name}")
+
+# looked up once per asset instead of walking the service and category chain
+show_handlers = {
+    ('season', 'kometa'): copy_kometa_season,
+    ('episode', 'kometa'): copy_kometa_episode,
+    ('season', 'plex'): copy_plex_season,
+    ('episode', 'plex'): copy_plex_episode,
+    #('season', 'emby')
+    #('season', 'jellyfin')
+    #('season', 'kodi')
+}
+
+def copy_and_rename(filename, src, stat, category, season_number, episode_number, dir_name, movies_dir, shows_dir, collections_dir, failed_dir, service):
+    # movie, show and collection folders were already matched by categories()
+    if category == 'movie':
+        return copy_library_asset(filename, src, stat, category, dir_name, movies_dir)
+    if category == 'show':
+        return copy_library_asset(filename, src, stat, category, dir_name, shows_dir)
+    if category == 'collection':
+        return copy_library_asset(filename, src, stat, category, dir_name, collections_dir)
+    handler = show_handlers.get((category, service))
+    if not handler:
+        move_to_failed(src, failed_dir)
+        return 'failed'
+    return handler(filename, src, stat, category, season_number, episode_number, shows_dir, failed_dir)
+
+## copy and move files ##
+def copy_file(src, dest, size):
+    # copy_file_range is Linux only and not supported by every filesystem
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dest, 'wb') as fdest:
+                remaining = size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdest.fileno(), remaining)
+                    if copied == 0:
+                        # some filesystems return 0 instead of failing, copyfile below redoes the whole file
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                return
+        except OSError:
+            pass
+    # copyfile still copies in the kernel where it can, sendfile on Linux and fcopyfile on macOS
+    shutil.copyfile(src, dest)
+
+def transfer_file(src, dest, size):
+    # without a backup the source is not kept, so a same-filesystem rename replaces the copy
+    if not backup_enabled:
+        try:
+            os.replace(src, dest)
+            moved_sources.add(src)
+            return "Moved"
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    copy_file(src, dest, size)
+    return "Copied"
+
+def move_file(src, dest):
+    try:
+        os.replace(src, dest)
+    except OSError as e:
+        # only a move across filesystems needs the copy and delete fallback
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dest)
+
 ## move failed assets ##
-def move_to_failed(filename, process_dir, failed_dir):
-    src = os.path.join(process_dir, filename)
-    dest = os.path.join(failed_dir, filename)
-    moved_counts['failed'] += 1
+def move_to_failed(src, failed_dir):
+    dest = os.path.join(failed_dir, os.path.basename(src))
     
     try:
-        shutil.move(src, dest)
+        move_file(src, dest)
     except FileNotFoundError:
         logger.error(" - File not found during move to failed directory")
     except PermissionError:
@@ -472,41 +580,76 @@ def move_to_failed(filename, process_dir, failed_dir):
         logger.error(f" - Failed to move to failed directory: {e}")
 
 ## backup assets ##
-def backup(filename, process_dir, backup_dir):
-    src = os.path.join(process_dir, filename)
-    dest = os.path.join(backup_dir, filename)
+def backup(src, backup_dir):
+    dest = os.path.join(backup_dir, os.path.basename(src))
     
     try:
-        shutil.move(src, dest)
+        move_file(src, dest)
         logger.info(" - Moved to backup directory")
     except FileNotFoundError:
         logger.error(" - File not found during backup")
     except PermissionError:
         logger.error(" - Permission denied when backing up")
     except Exception as e:
-        logger.error(" - Failed to backup to backup directory: {e}")
-
-## track assets ##
-copied_files = []
-
-moved_counts = {'movie':0, 'show': 0, 'season': 0, 'episode': 0, 'collection': 0, 'failed': 0} 
-
-## processing loop ##           
-unzip_files(process_dir)
-
-process_directories(process_dir)
-
-for filename in os.listdir(process_dir):
-    category, season_number, episode_number = categories(filename, movies_dir, shows_dir)
-    if category in ['movie', 'show', 'season', 'episode', 'collection']:
-        updated_category = copy_and_rename(filename, category, season_number, episode_number, movies_dir, shows_dir, collections_dir, process_dir, failed_dir, service)
+        logger.error(f" - Failed to backup to backup directory: {e}")
+
+## episode index ##
+@functools.lru_cache(maxsize=None)
+def episode_index(season_dir):
+    # only posters are added to season folders while running, so the video names are read once
+    index = {}
+    with os.scandir(season_dir) as entries:
+        for entry in entries:
+            video_name, video_extension = os.path.splitext(entry.name)
+            if video_extension.lower() in video_extensions:
+                video_match = episode_file_pattern.match(entry.name)
+                if video_match:
+                    index.setdefault((video_match.group(1), video_match.group(2)), video_name)
+    return index
+
+## index library directories ##
+def scan_directory(directory):
+    if not directory:
+        return []
+    try:
+        with os.scandir(directory) as entries:
+            return [entry.name for entry in entries if entry.is_dir()]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+## process assets ##
+def process_asset(entry):
+    filename = entry.name
+    src = entry.path
+    with logger.buffered():
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            logger.warning(f" {filename}: no longer in process directory, skipping")
+            logger.info("")
+            return 'failed'
+        try:
+            category, season_number, episode_number, dir_name = categories(filename, movies_dir, shows_dir)
+            if category not in sorted_categories:
+                return 'failed'
+            updated_category = copy_and_rename(filename, src, stat, category, season_number, episode_number, dir_name, movies_dir, shows_dir, collections_dir, failed_dir, service)
+        except Exception as e:
+            # one bad asset is failed on its own instead of stopping the whole pool
+            logger.info(f" {filename}:")
+            logger.error(f" - Failed to process: {e}")
+            move_to_failed(src, failed_dir)
+            logger.info(" - Moved to failed directory")
+            logger.info("")
+            return 'failed'
         if updated_category != 'failed':
-            if backup_enabled:
-                backup(filename, process_dir, backup_dir)
+            if src in moved_sources:
+                logger.info(" - Moved out of process directory")
+            elif backup_enabled:
+                backup(src, backup_dir)
                 #logger.info("")
             else:
                 try:
-                    os.remove(os.path.join(process_dir, filename))
+                    os.remove(src)
                     logger.info(" - Deleted from process directory")
                 except FileNotFoundError:
                     logger.error(" - File not found during deletion")
@@ -515,13 +658,101 @@ for filename in os.listdir(process_dir):
                 except Exception as e:
                     logger.error(f" - Failed to delete: {e}")
             logger.info("")
-            moved_counts[updated_category] += 1
+        return updated_category
+
+## track assets ##
+asset_categories = ('movie', 'show', 'season', 'episode', 'collection', 'failed')
+counts = collections.Counter()
+
+## asset cache ##
+asset_cache = AssetCache(cache_file)
+moved_sources = set()
+
+## library listing ##
+def scan_library():
+    return scan_directory(optional_dirs['movies']), scan_directory(optional_dirs['shows']), scan_directory(optional_dirs['collections'])
+
+## processing loop ##
+# the process directory is only read again when unpacking or flattening changed it
+zip_entries, dir_entries, file_entries = scan_process_directory(process_dir)
+# the library folders are listed in the background while archives and folders are unpacked
+library_future = None
+with concurrent.futures.ThreadPoolExecutor(max_workers=1) as library_scanner:
+    if zip_entries or dir_entries or any(is_image(entry.name) for entry in file_entries):
+        library_future = library_scanner.submit(scan_library)
+    if zip_entries:
+        unzip_files(process_dir, zip_entries)
+        zip_entries, dir_entries, file_entries = scan_process_directory(process_dir)
+    if dir_entries:
+        process_directories(process_dir, dir_entries)
+        zip_entries, _, file_entries = scan_process_directory(process_dir)
+# archives found inside archives are not unpacked again
+file_entries += zip_entries
+
+files_to_process = []
+unsupported_files = []
+for entry in file_entries:
+    if is_image(entry.name):
+        files_to_process.append(entry)
+    else:
+        unsupported_files.append(entry)
+
+## unsupported files ##
+if unsupported_files:
+    unsupported_lines = [f" Moved {len(unsupported_files)} unsupported file(s) to failed directory"]
+    for entry in unsupported_files:
+        move_to_failed(entry.path, failed_dir)
+        unsupported_lines.append(f" - {entry.name}")
+    counts['failed'] += len(unsupported_files)
+    logger.info("\n".join(unsupported_lines))
+    logger.info("")
+
+## library index ##
+# the library folders are only listed when there is something to sort into them
+if files_to_process and library_future:
+    movie_dirs, show_dirs, collection_dirs = library_future.result()
+else:
+    movie_dirs = show_dirs = collection_dirs = []
+movie_index = build_index(movie_dirs)
+show_index = build_index(show_dirs)
+show_folded = fold_names(show_dirs)
+movie_names = build_search(fold_names(movie_dirs))
+show_names = build_search(show_folded)
+show_prefixes = build_search(fold_show_prefixes(show_folded))
+collection_index = build_collection_index(collection_dirs)
+show_dir_names = frozenset(show_dirs)
+
+with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+    counts.update(executor.map(process_asset, files_to_process))
+
+asset_cache.save()
+moved_counts = {category: counts[category] for category in asset_categories}
 
 ## end ##
 end_time = time.time()
-logger.separator(text="Summary", debug=False, border=True)
-
 total_runtime = end_time - start_time
+
+## notifications ##
+summary = generate_summary(moved_counts, backup_enabled, total_runtime, version)
+
+## discord notification ##
+# posted in the background so the summary is logged without waiting on the network,
+# a daemon thread so a post that is still retrying does not hold up exit
+discord_webhook = config.get('discord_webhook')
+discord_errors = []
+
+def post_discord():
+    try:
+        discord(summary, discord_webhook, version, total_runtime)
+    except Exception as e:
+        discord_errors.append(e)
+
+notifier = None
+if discord_webhook:
+    notifier = threading.Thread(target=post_discord, daemon=True)
+    notifier.start()
+
+logger.separator(text="Summary", debug=False, border=True)
 logger.info(f' Movie Assets: {moved_counts["movie"]}')
 logger.info(f' Show Assets: {moved_counts["show"]}')
 logger.info(f' Season Posters: {moved_counts["season"]}')
@@ -531,17 +762,11 @@ logger.info(f' Failures: {moved_counts["failed"]}')
 
 current_date = datetime.now()
 
-## notifications ##
-summary = generate_summary(moved_counts, backup_enabled, total_runtime, version)
-
-## discord notification ##
-discord_webhook = config.get('discord_webhook')
-if discord_webhook:
-    discord(summary, discord_webhook, version, total_runtime)
-
-## version ##
-version_file = os.path.join(os.path.dirname(__file__), 'VERSION')
-with open(version_file, 'r') as f:
-    version = f.read().strip()
+if notifier:
+    notifier.join(timeout=15)
+    if notifier.is_alive():
+        logger.warning(" Discord notification timed out")
+    elif discord_errors:
+        logger.error(f" Discord notification failed: {discord_errors[0]}")
 
 logger.separator(text=f'Asset Assistant Finished\nTotal runtime {total_runtime:2f} seconds', debug=False, border=True)
\ No newline at end of file
@@ -0,0 +1,55 @@
+import json, os, threading
+
+class AssetCache:
+    def __init__(self, cache_file, max_entries=10000):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.entries = {}
+        self._lock = threading.Lock()
+        try:
+            with open(self.cache_file, "r") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def _key(self, src, stat):
+        return f"{os.path.basename(src)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def lookup(self, src, stat=None):
+        # returns where an unchanged asset was last copied to, if that copy is still in place
+        if stat is None:
+            try:
+                stat = os.stat(src)
+            except OSError:
+                return None
+        key = self._key(src, stat)
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+        try:
+            if os.path.getsize(entry["dest"]) != stat.st_size:
+                return None
+        except OSError:
+            return None
+        with self._lock:
+            # a hit counts as a use, so it moves to the most recent end like a new record
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+        return entry["dest"]
+
+    def record(self, src, category, dest, stat=None):
+        key = self._key(src, stat or os.stat(src))
+        with self._lock:
+            # re-inserted so the dict stays ordered from least to most recently recorded
+            self.entries.pop(key, None)
+            self.entries[key] = {"category": category, "dest": dest}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        temp_file = f"{self.cache_file}.tmp"
+        with self._lock:
+            for key in list(self.entries)[:-self.max_entries]:
+                del self.entries[key]
+            with open(temp_file, "w") as f:
+                json.dump(self.entries, f)
+        os.replace(temp_file, self.cache_file)
@@ -0,0 +1,47 @@
+import struct
+
+png_signature = b'\x89PNG\r\n\x1a\n'
+# start of frame markers, every 0xC0-0xCF code except DHT, JPG and DAC
+jpeg_frame_markers = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# the frame header normally sits well inside this, after the EXIF and colour profile segments
+header_size = 65536
+
+def jpeg_size(data):
+    i = 2
+    while i + 1 < len(data):
+        if data[i] != 0xFF:
+            return None
+        code = data[i + 1]
+        if code == 0xFF:
+            i += 1
+            continue
+        if code == 0x01 or 0xD0 <= code <= 0xD8:
+            i += 2
+            continue
+        if code in (0xD9, 0xDA):
+            return None
+        if code in jpeg_frame_markers:
+            if i + 9 > len(data):
+                return None
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        if i + 4 > len(data):
+            return None
+        i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    return None
+
+def image_size(path):
+    # reads the size from the PNG or JPEG header, anything else goes through PIL
+    with open(path, 'rb') as f:
+        data = f.read(header_size)
+    if data[:8] == png_signature and data[12:16] == b'IHDR':
+        return struct.unpack('>II', data[16:24])
+    if data[:2] == b'\xff\xd8':
+        size = jpeg_size(data)
+        if size:
+            return size
+    # PIL is only imported for files the header check can't read
+    import PIL.Image
+    with PIL.Image.open(path) as img:
+        return img.size
@@ -1,4 +1,6 @@
-import logging, os
+import logging, os, threading
+from contextlib import contextmanager
+from itertools import groupby
 from logging.handlers import RotatingFileHandler
 
 class MyLogger:
@@ -15,6 +17,13 @@ class MyLogger:
                 self._style._fmt = f"[%(asctime)s]  [{levelname}]     |%(message)-{self.screen_width}s|"
             else:
                 self._style._fmt = f"[%(asctime)s]  [{levelname}]    |%(message)-{self.screen_width}s|"
+            message = record.getMessage()
+            if "\n" in message:
+                # format each line of a multi-line record as its own log line
+                lines = []
+                for line in message.split("\n"):
+                    lines.append(super().format(logging.makeLogRecord({**record.__dict__, "msg": line, "args": None})))
+                return "\n".join(lines)
             return super().format(record)
 
     def __init__(self, separating_character='=', screen_width=100, log_file='assistant.log'):
@@ -26,6 +35,8 @@ class MyLogger:
         self.log_file = os.path.join(self.log_dir, log_file)
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.DEBUG)
+        self._buffers = threading.local()
+        self._emit_lock = threading.Lock()
         
         self.main_handler = self._get_handler(self.log_file)
 
@@ -39,20 +50,40 @@ class MyLogger:
         file_handler.setFormatter(file_formatter)
         self.logger.addHandler(file_handler)
 
+    def _log(self, level, msg):
+        records = getattr(self._buffers, 'records', None)
+        if records is not None:
+            records.append((level, msg))
+        else:
+            self.logger.log(level, msg)
+
+    @contextmanager
+    def buffered(self):
+        # hold this thread's messages and write them as one block on exit
+        self._buffers.records = []
+        try:
+            yield
+        finally:
+            records = self._buffers.records
+            self._buffers.records = None
+            with self._emit_lock:
+                for level, group in groupby(records, key=lambda record: record[0]):
+                    self.logger.log(level, "\n".join(msg for _, msg in group))
+
     def info(self, msg):
-        self.logger.info(msg)
+        self._log(logging.INFO, msg)
         
     def info_center(self, msg):
-        self.logger.info(self._centered(str(msg)))
+        self._log(logging.INFO, "\n".join(self._centered(line) for line in str(msg).split("\n")))
         
     def debug(self, msg):
-        self.logger.debug(msg)
+        self._log(logging.DEBUG, msg)
 
     def warning(self, msg):
-        self.logger.warning(msg)
+        self._log(logging.WARNING, msg)
 
     def error(self, msg):
-        self.logger.error(msg)
+        self._log(logging.ERROR, msg)
         
     def print(self, msg, error=False, warning=False, debug=False):
         if error:
@@ -0,0 +1,75 @@
+import bisect, re
+
+title_year_pattern = re.compile(r'^(.+?)\s\((\d{4})\)')
+
+def build_index(dir_names):
+    index = {}
+    for dir_name in dir_names:
+        match = title_year_pattern.match(dir_name)
+        if match:
+            index.setdefault((match.group(1).casefold(), match.group(2)), dir_name)
+    return index
+
+def fold_names(dir_names):
+    return [(dir_name.casefold(), dir_name) for dir_name in dir_names]
+
+def fold_show_prefixes(folded_names):
+    # built from the already folded names so each show folder is only casefolded once
+    return [(folded_name.split(')')[0].strip(), dir_name) for folded_name, dir_name in folded_names]
+
+def build_search(folded_names):
+    # joins the folded names into one string so a substring lookup is a single str.find
+    text = "\n".join(folded_name for folded_name, _ in folded_names)
+    starts = []
+    position = 0
+    for folded_name, _ in folded_names:
+        starts.append(position)
+        position += len(folded_name) + 1
+    return text, starts, [dir_name for _, dir_name in folded_names]
+
+def search_names(name, search):
+    # first folder whose folded name contains name, same order as a linear scan
+    text, starts, dir_names = search
+    if not dir_names or "\n" in name:
+        return None
+    position = text.find(name)
+    if position < 0:
+        return None
+    return dir_names[bisect.bisect_right(starts, position) - 1]
+
+def collection_key(name):
+    return name.casefold().replace("collection", "").strip()
+
+def build_collection_index(dir_names):
+    index = {}
+    for dir_name in dir_names:
+        index.setdefault(collection_key(dir_name), dir_name)
+    return index
+
+def media_key(filename):
+    # parsed once per asset and shared by the movie and show lookups
+    name = filename.split('.')[0]
+    match = title_year_pattern.match(name)
+    if match and match.end() == len(name):
+        return name.casefold(), (match.group(1).casefold(), match.group(2))
+    return name.casefold(), None
+
+def find_media_directory(key, search, index):
+    name, title_year = key
+    if title_year:
+        dir_name = index.get(title_year)
+        if dir_name:
+            return dir_name
+    return search_names(name, search)
+
+def find_show_directory(filename, search, index):
+    match = title_year_pattern.match(filename)
+    if match:
+        dir_name = index.get((match.group(1).casefold(), match.group(2)))
+        if dir_name:
+            return dir_name
+    prefix = filename.split(')')[0].strip().casefold()
+    return search_names(prefix, search)
+
+def find_collection_directory(filename, index):
+    return index.get(collection_key(filename.split('.')[0]))
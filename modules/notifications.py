@@ -1,9 +1,20 @@
-import requests
+import functools
 from datetime import datetime
 
+image_url = "https://raw.githubusercontent.com/mikenobbs/AssetAssistant/main/logo/logomark.png"
+
+@functools.lru_cache(maxsize=None)
+def get_session():
+    # requests is only imported once a webhook is actually sent
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=Retry(total=3, backoff_factor=0.2)))
+    return session
+
 def discord(summary, discord_webhook, version, total_runtime):
     current_date = datetime.now()
-    image_url = "https://raw.githubusercontent.com/mikenobbs/AssetAssistant/main/logo/logomark.png"
     footer_text = f"Asset Assistant [v{version}] | {current_date.strftime('%d/%m/%Y %H:%M')}"
     color = 0x9E9E9E
 
@@ -15,13 +26,15 @@ def discord(summary, discord_webhook, version, total_runtime):
         "color": color
     }
 
-    response = requests.post(discord_webhook, json={"embeds": [embed]})
+    response = get_session().post(discord_webhook, json={"embeds": [embed]}, timeout=(3.05, 10))
+    response.raise_for_status()
 
 def generate_summary(moved_counts, backup_enabled, total_runtime, version):
-    summary = f"**Movie Assets:**\n {moved_counts['movies_dir']}\n"
-    summary += f"**Show Assets:**\n {moved_counts['shows_dir']}\n"
-    summary += f"**Collection Assets:**\n {moved_counts['collections_dir']}\n"
-    summary += f"**Failures:**\n {moved_counts['failed_dir']}\n"
-    summary += f"**Backup Enabled?**\n {'Yes' if backup_enabled else 'No'}\n"
-    summary += f"**Total Run Time:**\n {total_runtime:.2f} seconds\n"
-    return summary
+    return "".join([
+        f"**Movie Assets:**\n {moved_counts['movie']}\n",
+        f"**Show Assets:**\n {moved_counts['show']}\n",
+        f"**Collection Assets:**\n {moved_counts['collection']}\n",
+        f"**Failures:**\n {moved_counts['failed']}\n",
+        f"**Backup Enabled?**\n {'Yes' if backup_enabled else 'No'}\n",
+        f"**Total Run Time:**\n {total_runtime:.2f} seconds\n",
+    ])